@@ -17,43 +17,141 @@ Este ejemplo ilustra:
 - Sincronización básica con join()
 """
 
+import atexit
 import logging
+import logging.handlers
+import os
+import queue
+import sys
 import threading
-from contextlib import ExitStack
+import time
 
 TRACE_FILE = "ParteB_Ejercicio1.log"
+TRACE_BUFFER_SIZE = 64 * 1024  # Buffer del fichero de trazas (64 KiB)
+TRACE_DATEFMT = "%Y-%m-%d %H:%M:%S"
+# Líneas de traza por registro: agrupar reduce los registros encolados y el
+# límite mantiene acotada la memoria aunque haya muchas repeticiones
+TRAZAS_POR_REGISTRO = 1024
+# Líneas de consola por escritura: se mantiene la intercalación entre hilos
+# sin tomar el lock de stdout en cada iteración
+LINEAS_POR_ESCRITURA = 1024
+
+# Intervalo (en segundos) tras el cual el intérprete fuerza el cambio de hilo
+# que tiene el GIL. El valor por defecto de CPython es 0.005; con un valor
+# mayor cada hilo avanza más iteraciones antes de ceder el GIL y se reducen
+# los cambios de contexto, a costa de una intercalación menos equitativa
+# entre los hilos. Se puede sobrescribir con PB1_SWITCH_INTERVAL.
+SWITCH_INTERVAL = 0.05
+
+
+class _BufferedFileHandler(logging.FileHandler):
+    """
+    FileHandler que escribe por bloques en lugar de vaciar tras cada registro.
+
+    El fichero se abre con un buffer de TRACE_BUFFER_SIZE bytes y flush() no
+    hace nada, de modo que las trazas solo llegan al disco cuando el buffer se
+    llena, al llamar a vaciar() o al cerrar el handler.
+    """
+
+    def _open(self):
+        return open(
+            self.baseFilename,
+            self.mode,
+            buffering=TRACE_BUFFER_SIZE,
+            encoding=self.encoding,
+            errors=self.errors,
+        )
+
+    def flush(self):
+        # StreamHandler.emit llama a flush() tras cada registro; se omite a propósito
+        pass
+
+    def vaciar(self):
+        """Vuelca al fichero el contenido pendiente del buffer."""
+        self.acquire()
+        try:
+            if self.stream is not None:
+                self.stream.flush()
+        finally:
+            self.release()
+
+
+class _TraceFormatter(logging.Formatter):
+    """
+    Formatter que deja intactos los bloques de trazas ya formateados.
+
+    Los registros con el atributo ``preformateado`` contienen líneas que el
+    propio hilo ha generado con el formato del fichero, por lo que se escriben
+    tal cual; el resto de registros se formatean con normalidad.
+    """
+
+    def format(self, record):
+        if getattr(record, "preformateado", False):
+            return record.getMessage()
+        return super().format(record)
+
+
+# Handlers de fichero ya creados, indexados por ruta. Se reutilizan en
+# llamadas sucesivas a configurar_trazas y se cierran al terminar el proceso.
+_HANDLER_CACHE: dict[str, _BufferedFileHandler] = {}
+
+
+def _cerrar_handlers():
+    """Vuelca y cierra los handlers de fichero cacheados."""
+    for handler in _HANDLER_CACHE.values():
+        handler.vaciar()
+        handler.close()
+
+
+atexit.register(_cerrar_handlers)
 
 
 def configurar_trazas():
     """
     Configura el registrador de trazas compartido por todos los hilos.
 
-    Se utiliza un FileHandler en modo escritura para reiniciar el fichero
-    en cada ejecución y se formatea cada línea con la marca de tiempo,
-    nombre del hilo y mensaje.
+    Los hilos no escriben directamente en el fichero: el logger tiene un
+    QueueHandler que encola cada registro, y un QueueListener con su propio
+    hilo se encarga de volcarlos al FileHandler. El FileHandler se abre en
+    modo escritura para reiniciar el fichero en cada ejecución y formatea
+    cada línea con la marca de tiempo, nombre del hilo y mensaje.
+
+    El FileHandler se crea una sola vez por fichero y se guarda en
+    _HANDLER_CACHE; cada llamada crea una cola y un listener nuevos.
+
+    Returns:
+        tuple: (logger, listener)
     """
 
     # Configuración del logger
     logger = logging.getLogger("traza")
     logger.setLevel(logging.INFO)
 
-    # Evitar añadir múltiples handlers si ya está configurado
-    if logger.handlers:
-        return logger
+    logger.propagate = False
 
-    # Configuración del handler y formato
-    handler = logging.FileHandler(TRACE_FILE, mode="w", encoding="utf-8")
-    formato = logging.Formatter(
-        "[%(asctime)s.%(msecs)03d] %(threadName)s | %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
+    # Configuración del handler y formato, reutilizando el ya creado si existe
+    handler = _HANDLER_CACHE.get(TRACE_FILE)
+    if handler is None:
+        handler = _BufferedFileHandler(TRACE_FILE, mode="w", encoding="utf-8", delay=True)
+        formato = _TraceFormatter(
+            "[%(asctime)s.%(msecs)03d] %(threadName)s | %(message)s",
+            datefmt=TRACE_DATEFMT,
+        )
+        handler.setFormatter(formato)
+        _HANDLER_CACHE[TRACE_FILE] = handler
 
-    # Asignar formato al handler y añadirlo al logger
-    handler.setFormatter(formato)
-    logger.addHandler(handler)
-    logger.propagate = False
+    # Evitar acumular colas de configuraciones anteriores
+    for anterior in list(logger.handlers):
+        logger.removeHandler(anterior)
 
-    return logger
+    # Cola intermedia: los hilos encolan y el listener escribe en el fichero
+    cola = queue.Queue(-1)
+    logger.addHandler(logging.handlers.QueueHandler(cola))
+
+    listener = logging.handlers.QueueListener(cola, handler, respect_handler_level=True)
+    listener.start()
+
+    return logger, listener
 
 
 class MiHilo(threading.Thread):
@@ -84,6 +182,8 @@ class MiHilo(threading.Thread):
         Imprime la cadena especificada el número de veces indicado,
         mostrando el nombre del hilo y el número de iteración actual.
         Además de la salida por consola, registra trazas en un fichero.
+        El campo ``hilos_activos`` de cada traza cuenta también el hilo del
+        QueueListener que escribe el fichero.
         """
         thread_id = threading.get_ident()  # Identificador numérico del hilo en ejecución
         self.logger.info(
@@ -92,18 +192,62 @@ class MiHilo(threading.Thread):
             self.entero,
             self.cadena,
         )
-        for i in range(self.entero):
-            print(f"Hilo {self.name} (id={thread_id}) - Iteración {i + 1}: {self.cadena}")
-            self.logger.info(
-                "iteracion=%d | hilo_id=%d | mensaje=%r | hilos_activos=%d",
-                i + 1,
-                thread_id,
-                self.cadena,
-                threading.active_count(),
+        # Las trazas de cada iteración se generan ya formateadas, con su propia
+        # marca de tiempo, y se emiten en bloques de TRAZAS_POR_REGISTRO líneas.
+        trazas = []
+        # La salida por consola también se escribe por bloques de
+        # LINEAS_POR_ESCRITURA líneas.
+        salida = []
+        segundo_actual = None
+        prefijo_fecha = ""
+        # Valores invariantes durante el bucle: se calculan una sola vez
+        nombre = self.name
+        cadena = self.cadena
+        mensaje_repr = repr(cadena)
+        # Si el nivel INFO está desactivado no se genera ninguna traza en el bucle
+        info_activo = self.logger.isEnabledFor(logging.INFO)
+        # Se itera directamente sobre el número de iteración (1..entero)
+        for iteracion in range(1, self.entero + 1):
+            salida.append(f"Hilo {nombre} (id={thread_id}) - Iteración {iteracion}: {cadena}\n")
+            if len(salida) >= LINEAS_POR_ESCRITURA:
+                sys.stdout.write("".join(salida))
+                salida.clear()
+            if not info_activo:
+                continue
+            ahora = time.time()
+            segundo = int(ahora)
+            if segundo != segundo_actual:
+                # strftime solo se recalcula cuando cambia el segundo
+                segundo_actual = segundo
+                prefijo_fecha = time.strftime(TRACE_DATEFMT, time.localtime(segundo))
+            trazas.append(
+                f"[{prefijo_fecha}.{int((ahora - segundo) * 1000):03d}] {nombre} "
+                f"| iteracion={iteracion} | hilo_id={thread_id} | mensaje={mensaje_repr} "
+                f"| hilos_activos={threading.active_count()}"
             )
+            if len(trazas) >= TRAZAS_POR_REGISTRO:
+                self.logger.info("%s", "\n".join(trazas), extra={"preformateado": True})
+                trazas.clear()
+        sys.stdout.write("".join(salida))
+        if trazas:
+            self.logger.info("%s", "\n".join(trazas), extra={"preformateado": True})
         self.logger.info("fin | hilo_id=%d | repeticiones=%d", thread_id, self.entero)
 
 
+def intervalo_conmutacion():
+    """
+    Devuelve el intervalo de cambio de hilo a aplicar durante la ejecución.
+
+    Usa la variable de entorno PB1_SWITCH_INTERVAL si contiene un número
+    positivo y, en otro caso, SWITCH_INTERVAL.
+    """
+    try:
+        intervalo = float(os.environ.get("PB1_SWITCH_INTERVAL", SWITCH_INTERVAL))
+    except ValueError:
+        return SWITCH_INTERVAL
+    return intervalo if intervalo > 0 else SWITCH_INTERVAL
+
+
 def main():
     """
     Función principal que gestiona la ejecución de los hilos.
@@ -113,17 +257,21 @@ def main():
         - Un número entero para las repeticiones
         - Dos cadenas de texto diferentes
     2. Crea dos hilos con los datos introducidos
-    3. Inicia los hilos de forma concurrente
+    3. Inicia ambos hilos seguidos, sin trabajo intermedio
     4. Espera a que ambos hilos terminen
     5. Notifica la finalización del programa
 
     La función implementa manejo de excepciones para una
     terminación limpia en caso de interrupción del usuario.
     """
-    logger = configurar_trazas()
+    logger, listener = configurar_trazas()
     threading.current_thread().name = "principal"
+    # Registro previo al input(): el listener abre el fichero mientras se espera
     logger.info("inicio | Esperando datos de entrada")
 
+    # Intervalo del GIL que se restaura al salir, pase lo que pase
+    intervalo_original = sys.getswitchinterval()
+
     try:
         print("Introduce un entero:")
         input_value = input()
@@ -142,22 +290,39 @@ def main():
             string2,
         )
 
-        with ExitStack() as stack:
-            hilo1 = MiHilo(
+        hilos = [
+            MiHilo(
                 repeticiones,
                 string1,
                 nombre_hilo="Hilo-1",
                 logger=logger,
-            )
-            hilo2 = MiHilo(
+            ),
+            MiHilo(
                 repeticiones,
                 string2,
                 nombre_hilo="Hilo-2",
                 logger=logger,
-            )
+            ),
+        ]
 
-            stack.enter_context(_ThreadContext(hilo1))
-            stack.enter_context(_ThreadContext(hilo2))
+        # Ampliar el intervalo del GIL solo mientras trabajan los hilos
+        sys.setswitchinterval(intervalo_conmutacion())
+        logger.info(
+            "configuracion | switch_interval=%.3f | original=%.3f",
+            sys.getswitchinterval(),
+            intervalo_original,
+        )
+
+        # Arrancar todos los hilos seguidos y registrarlo después, para que
+        # empiecen a trabajar lo más a la vez posible
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            logger.info("creacion_hilo | Lanzado %s", hilo.name)
+
+        for hilo in hilos:
+            hilo.join()
+            logger.info("join_hilo | Finalizado %s", hilo.name)
 
         print("Finalización de los hilos.")
         logger.info("fin | Programa completado")
@@ -168,30 +333,11 @@ def main():
         print("\nError: Por favor, introduce un número entero válido para las repeticiones.")
         logger.warning("entrada_invalida | dato=%r", input_value)
     finally:
-        for handler in logger.handlers:
-            handler.close()
-
-
-class _ThreadContext:
-    """
-    Context manager que inicia un hilo al entrar y realiza join al salir.
-
-    Facilita la gestión segura de los hilos junto con ExitStack, garantizando
-    que se esperará a su finalización incluso si se produce una excepción.
-    """
-
-    def __init__(self, hilo: threading.Thread):
-        self.hilo = hilo
-
-    def __enter__(self):
-        self.hilo.start()
-        logging.getLogger("traza").info("creacion_hilo | Lanzado %s", self.hilo.name)
-        return self.hilo
-
-    def __exit__(self, exc_type, exc, exc_tb):
-        self.hilo.join()
-        logging.getLogger("traza").info("join_hilo | Finalizado %s", self.hilo.name)
-        return False
+        sys.setswitchinterval(intervalo_original)
+        # Detener el listener vacía la cola; el fichero se cierra al salir
+        listener.stop()
+        for handler in listener.handlers:
+            handler.vaciar()
 
 
 if __name__ == "__main__":
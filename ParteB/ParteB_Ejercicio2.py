@@ -13,34 +13,119 @@ La paralelización se realiza a nivel de fila, maximizando la
 eficiencia al distribuir el trabajo entre múltiples hilos.
 """
 
+import atexit
 import logging
+import logging.handlers
+import operator
+import queue
 import threading
+import time
+from array import array
 from contextlib import ExitStack
 
 # Constantes
 N = 3  # Tamaño de las matrices NxN
 TRACE_FILE = "ParteB_Ejercicio2.log"
+TRACE_BUFFER_SIZE = 64 * 1024  # Buffer del fichero de trazas (64 KiB)
+TRACE_DATEFMT = "%Y-%m-%d %H:%M:%S"
+# Valor absoluto máximo admitido en A y B: la suma de dos valores así siempre
+# cabe en un entero de 64 bits con signo, que es como se almacenan las matrices
+VALOR_MAXIMO = 2**62 - 1
+
+
+class _BufferedFileHandler(logging.FileHandler):
+    """
+    FileHandler que escribe por bloques en lugar de vaciar tras cada registro.
+
+    El fichero se abre con un buffer de TRACE_BUFFER_SIZE bytes y flush() no
+    hace nada, de modo que las trazas solo llegan al disco cuando el buffer se
+    llena, al llamar a vaciar() o al cerrar el handler.
+    """
+
+    def _open(self):
+        return open(
+            self.baseFilename,
+            self.mode,
+            buffering=TRACE_BUFFER_SIZE,
+            encoding=self.encoding,
+            errors=self.errors,
+        )
+
+    def flush(self):
+        # StreamHandler.emit llama a flush() tras cada registro; se omite a propósito
+        pass
+
+    def vaciar(self):
+        """Vuelca al fichero el contenido pendiente del buffer."""
+        self.acquire()
+        try:
+            if self.stream is not None:
+                self.stream.flush()
+        finally:
+            self.release()
+
+
+class _TraceFormatter(logging.Formatter):
+    """
+    Formatter que deja intactos los bloques de trazas ya formateados.
+
+    Los registros con el atributo ``preformateado`` contienen líneas que el
+    propio hilo ha generado con el formato del fichero, por lo que se escriben
+    tal cual; el resto de registros se formatean con normalidad.
+    """
+
+    def format(self, record):
+        if getattr(record, "preformateado", False):
+            return record.getMessage()
+        return super().format(record)
+
+
+# Handlers de fichero ya creados, indexados por ruta. Se reutilizan en
+# llamadas sucesivas a configurar_trazas y se cierran al terminar el proceso.
+_HANDLER_CACHE: dict[str, _BufferedFileHandler] = {}
+
+
+def _cerrar_handlers():
+    """Vuelca y cierra los handlers de fichero cacheados."""
+    for handler in _HANDLER_CACHE.values():
+        handler.vaciar()
+        handler.close()
+
+
+atexit.register(_cerrar_handlers)
 
 
 def configurar_trazas():
     """
     Configura el registrador de trazas compartido por todos los hilos.
+
+    Los registros se encolan y un QueueListener los escribe en el fichero.
+    El handler de fichero se reutiliza entre llamadas. Devuelve (logger, listener).
     """
     logger = logging.getLogger("traza")
     logger.setLevel(logging.INFO)
 
-    if logger.handlers:
-        return logger
-
-    handler = logging.FileHandler(TRACE_FILE, mode="w", encoding="utf-8")
-    formato = logging.Formatter(
-        "[%(asctime)s.%(msecs)03d] %(threadName)s | %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
-    handler.setFormatter(formato)
-    logger.addHandler(handler)
     logger.propagate = False
-    return logger
+
+    handler = _HANDLER_CACHE.get(TRACE_FILE)
+    if handler is None:
+        handler = _BufferedFileHandler(TRACE_FILE, mode="w", encoding="utf-8", delay=True)
+        formato = _TraceFormatter(
+            "[%(asctime)s.%(msecs)03d] %(threadName)s | %(message)s",
+            datefmt=TRACE_DATEFMT,
+        )
+        handler.setFormatter(formato)
+        _HANDLER_CACHE[TRACE_FILE] = handler
+
+    for anterior in list(logger.handlers):
+        logger.removeHandler(anterior)
+
+    cola = queue.Queue(-1)
+    logger.addHandler(logging.handlers.QueueHandler(cola))
+
+    listener = logging.handlers.QueueListener(cola, handler, respect_handler_level=True)
+    listener.start()
+    return logger, listener
 
 
 class MiHilo(threading.Thread):
@@ -55,9 +140,9 @@ class MiHilo(threading.Thread):
 
         Args:
             fila (int): Índice de la fila a procesar
-            mat_a (list): Primera matriz de entrada
-            mat_b (list): Segunda matriz de entrada
-            mat_c (list): Matriz resultado donde se almacenará la suma
+            mat_a (list[memoryview]): Primera matriz de entrada
+            mat_b (list[memoryview]): Segunda matriz de entrada
+            mat_c (list[memoryview]): Matriz resultado donde se almacenará la suma
             nombre_hilo (str): Nombre legible del hilo para las trazas
             logger (logging.Logger): Registrador compartido para la escritura de trazas
         """
@@ -77,82 +162,117 @@ class MiHilo(threading.Thread):
         en el fichero de trazas compartido.
         """
         thread_id = threading.get_ident()  # Identificador numérico del hilo de trabajo
+        # Filas e índice de trabajo: se resuelven una sola vez
+        fila_1 = self.fila + 1
+        fila_a = self.mat_a[self.fila]
+        fila_b = self.mat_b[self.fila]
+        fila_c = self.mat_c[self.fila]
         self.logger.info(
             "inicio | fila=%d | hilo_id=%d | datos_A=%s | datos_B=%s",
-            self.fila + 1,
+            fila_1,
             thread_id,
-            self.mat_a[self.fila],
-            self.mat_b[self.fila],
+            fila_a.tolist(),
+            fila_b.tolist(),
         )
-        for i in range(N):
-            valor_a = self.mat_a[self.fila][i]
-            valor_b = self.mat_b[self.fila][i]
-            resultado = valor_a + valor_b
-            self.mat_c[self.fila][i] = resultado
-            self.logger.info(
-                "iteracion | fila=%d | columna=%d | hilo_id=%d | %d + %d = %d",
-                self.fila + 1,
-                i + 1,
-                thread_id,
-                valor_a,
-                valor_b,
-                resultado,
+        # La fila completa se calcula de una vez y se escribe sobre la fila de C
+        # sin indexar elemento a elemento las tres matrices. map con
+        # operator.add recorre la fila en C, sin ejecutar bytecode por elemento.
+        fila_c[:] = array("q", map(operator.add, fila_a, fila_b))
+        # Se acumulan las trazas por columna y se emiten en un único registro,
+        # solo si el nivel INFO está activo. Cada línea lleva ya el prefijo del
+        # fichero, calculado una sola vez porque la fila se suma de golpe.
+        if self.logger.isEnabledFor(logging.INFO):
+            ahora = time.time()
+            segundo = int(ahora)
+            prefijo = (
+                f"[{time.strftime(TRACE_DATEFMT, time.localtime(segundo))}"
+                f".{int((ahora - segundo) * 1000):03d}] {self.name} | "
             )
+            trazas = [f"{prefijo}iteraciones | fila={fila_1}"]
+            trazas.extend(
+                f"{prefijo}iteracion | fila={fila_1} | columna={columna} | hilo_id={thread_id} "
+                f"| {valor_a} + {valor_b} = {resultado}"
+                for columna, (valor_a, valor_b, resultado) in enumerate(
+                    zip(fila_a, fila_b, fila_c), start=1
+                )
+            )
+            self.logger.info("%s", "\n".join(trazas), extra={"preformateado": True})
         self.logger.info(
             "fin | fila=%d | hilo_id=%d | resultado=%s",
-            self.fila + 1,
+            fila_1,
             thread_id,
-            self.mat_c[self.fila],
+            fila_c.tolist(),
         )
 
 
+def crear_matriz():
+    """
+    Crea una matriz NxN inicializada a ceros.
+
+    Los N*N valores se guardan en un único array.array de enteros de 64 bits
+    ("q"), contiguos en memoria, y cada fila es un memoryview sobre su tramo
+    del buffer: las filas no copian datos y la matriz ocupa una sola reserva.
+
+    Returns:
+        list[memoryview]: Filas de la matriz NxN de ceros
+    """
+    datos = memoryview(array("q", [0]) * (N * N))
+    return [datos[fila * N : (fila + 1) * N] for fila in range(N)]
+
+
 def rellenar_matriz(matriz, id_matriz, logger):
     """
     Rellena una matriz NxN con valores introducidos por el usuario.
 
-    La función solicita valores para cada posición de la matriz,
-    validando que sean números enteros válidos. Proporciona
-    retroalimentación visual de la posición actual y maneja
-    errores de entrada.
+    La función solicita cada fila completa en una sola línea, con los N
+    valores separados por espacios, validando que sean exactamente N
+    números enteros con valor absoluto no mayor que VALOR_MAXIMO, de modo
+    que la suma A + B no desborde los 64 bits. Si la fila no es válida se
+    vuelve a pedir.
 
     Args:
-        matriz (list): Matriz NxN a rellenar
+        matriz (list[memoryview]): Matriz NxN a rellenar
         id_matriz (str): Identificador de la matriz (ej: 'A' o 'B')
 
     Returns:
-        list: Matriz rellenada con los valores introducidos
+        list[memoryview]: Matriz rellenada con los valores introducidos
 
     Raises:
         ValueError: Si el usuario introduce un valor no numérico
     """
     for i in range(N):
-        for j in range(N):
-            while True:
-                try:
-                    valor = int(
-                        input(
-                            f"Introduce el valor para la matriz {id_matriz} en fila {i}, columna {j}: "
-                        )
-                    )
-                    matriz[i][j] = valor
-                    logger.info(
-                        "entrada | matriz=%s | fila=%d | columna=%d | valor=%d",
-                        id_matriz,
-                        i + 1,
-                        j + 1,
-                        valor,
-                    )
-                    break
-                except ValueError:
-                    print("Por favor, introduce un número entero válido.")
-                    logger.warning(
-                        "entrada_invalida | matriz=%s | fila=%d | columna=%d",
-                        id_matriz,
-                        i + 1,
-                        j + 1,
-                    )
+        while True:
+            try:
+                linea = input(f"Introduce los {N} valores de la fila {i} de la matriz {id_matriz}: ")
+                # Los campos de split() se convierten con map(int, ...) a un array de
+                # int64, que se copia de una vez sobre la fila de la matriz
+                valores = array("q", map(int, linea.split()))
+                if len(valores) != N:
+                    raise ValueError(f"se esperaban {N} valores y se recibieron {len(valores)}")
+                if max(map(abs, valores)) > VALOR_MAXIMO:
+                    raise ValueError(f"los valores deben estar entre -{VALOR_MAXIMO} y {VALOR_MAXIMO}")
+                matriz[i][:] = valores
+                logger.info(
+                    "entrada | matriz=%s | fila=%d | valores=%s",
+                    id_matriz,
+                    i + 1,
+                    valores.tolist(),
+                )
+                break
+            except (ValueError, OverflowError):
+                print(
+                    f"Por favor, introduce {N} números enteros entre -{VALOR_MAXIMO} y "
+                    f"{VALOR_MAXIMO} separados por espacios."
+                )
+                logger.warning(
+                    "entrada_invalida | matriz=%s | fila=%d",
+                    id_matriz,
+                    i + 1,
+                )
     print(f"\nMatriz {id_matriz} rellenada correctamente.\n\n")
-    logger.info("matriz_completa | matriz=%s | datos=%s", id_matriz, matriz)
+    logger.info(
+        "matriz_completa | matriz=%s | datos=%s", id_matriz, [fila.tolist() for fila in matriz]
+    )
     return matriz
 
 
@@ -165,7 +285,7 @@ def imprimir_resultado(matriz, logger):
     de 5 caracteres para mantener el alineamiento visual.
 
     Args:
-        matriz (list): Matriz NxN a imprimir
+        matriz (list[memoryview]): Matriz NxN a imprimir
 
     Example:
         Para una matriz 3x3, la salida se verá así:
@@ -173,10 +293,10 @@ def imprimir_resultado(matriz, logger):
             4    5    6
             7    8    9
     """
-    print("\nMatriz Resultado:")
-    for fila in matriz:
-        print(" ".join(f"{valor:5d}" for valor in fila))
-    logger.info("resultado | matriz=%s", matriz)
+    # La tabla completa se compone en memoria y se imprime con una sola llamada
+    tabla = "\n".join(" ".join(f"{valor:5d}" for valor in fila) for fila in matriz)
+    print(f"\nMatriz Resultado:\n{tabla}")
+    logger.info("resultado | matriz=%s", [fila.tolist() for fila in matriz])
 
 
 def main():
@@ -194,15 +314,16 @@ def main():
     La función implementa manejo de excepciones para una
     terminación limpia en caso de interrupción del usuario.
     """
-    logger = configurar_trazas()
+    logger, listener = configurar_trazas()
     threading.current_thread().name = "principal"
+    # Registro previo al input(): el listener abre el fichero mientras se espera
     logger.info("inicio | Preparando lectura de matrices")
 
     try:
         # 1. Crear matrices A y B (rellenar_matriz)
-        matriz_a = [[0] * N for _ in range(N)]  # Inicializar matriz A como matriz NxN con ceros
-        matriz_b = [[0] * N for _ in range(N)]  # Inicializar matriz B como matriz NxN con ceros
-        matriz_c = [[0] * N for _ in range(N)]  # Matriz resultado
+        matriz_a = crear_matriz()  # Inicializar matriz A como matriz NxN con ceros
+        matriz_b = crear_matriz()  # Inicializar matriz B como matriz NxN con ceros
+        matriz_c = crear_matriz()  # Matriz resultado
 
         rellenar_matriz(matriz_a, "A", logger)
         rellenar_matriz(matriz_b, "B", logger)
@@ -231,8 +352,10 @@ def main():
         print("\nPrograma interrumpido por el usuario")
         logger.info("interrupcion | Programa detenido por el usuario")
     finally:
-        for handler in logger.handlers:
-            handler.close()
+        # Detener el listener vacía la cola; el fichero se cierra al salir
+        listener.stop()
+        for handler in listener.handlers:
+            handler.vaciar()
 
 
 class _ThreadContext:
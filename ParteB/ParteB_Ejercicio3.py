@@ -3,30 +3,115 @@ Búsqueda Concurrente en Vector
 
 Este módulo implementa una búsqueda paralela de un número en un vector
 utilizando múltiples hilos. El vector se divide en segmentos y cada hilo
-busca en su segmento asignado, actualizando un contador global de forma
-sincronizada.
+busca en su segmento asignado, guardando sus coincidencias en su propia
+posición de un array de resultados que el hilo principal suma al terminar.
 
 El programa utiliza:
-- Threading para búsqueda paralela
-- Lock para sincronización del contador global
+- Un ThreadPoolExecutor de 4 hilos, reutilizado entre búsquedas
+- Un array("q") de resultados parciales, sin locks, con la posición de
+  cada hilo en su propia línea de caché para evitar falso compartido
 - Segmentación del vector para distribuir la carga
 
-La sincronización asegura que el conteo total sea preciso incluso
-con múltiples hilos actualizando el contador simultáneamente.
+Como ningún hilo modifica un contador compartido, el conteo total es
+preciso sin necesidad de exclusión mutua.
 """
 
+import atexit
+import concurrent.futures
 import logging
+import logging.handlers
+import queue
+import sys
 import threading
-from contextlib import ExitStack
+import time
+from array import array
 
-# Variable global para contar las ocurrencias totales del número
+# Variable global con las ocurrencias totales del número (la calcula main)
 contador_global = 0
 
-# Lock para proteger el acceso al contador global
-lock = threading.Lock()
+# Separación entre los resultados parciales de dos hilos: un int64 por línea
+# de caché de 64 bytes, para que hilos distintos no escriban en la misma línea
+CACHE_LINE = 64
+_RELLENO = CACHE_LINE // array("q").itemsize
+
+# Pool de hilos de búsqueda, reutilizado entre consultas para no crear y
+# destruir un hilo por segmento en cada búsqueda
+_pool = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="Segmento")
+
+# Lock para que cada hilo vuelque su salida por consola de forma atómica
+print_lock = threading.Lock()
 
 # Configuración básica del fichero donde se almacenan las trazas
 TRACE_FILE = "ParteB_Ejercicio3.log"
+TRACE_BUFFER_SIZE = 64 * 1024  # Buffer del fichero de trazas (64 KiB)
+TRACE_DATEFMT = "%Y-%m-%d %H:%M:%S"
+
+# Plantillas de las trazas emitidas por cada hilo de búsqueda
+_FMT_INICIO = "inicio | hilo=%s | hilo_id=%d | segmento=%s | tamaño=%d | objetivo=%d"
+_FMT_RESUMEN = "resumen | hilo=%s | hilo_id=%d | coincidencias=%d | posiciones=%s"
+_FMT_FIN = "fin | hilo=%s | hilo_id=%d | coincidencias_locales=%d"
+
+
+class _BufferedFileHandler(logging.FileHandler):
+    """
+    FileHandler que escribe por bloques en lugar de vaciar tras cada registro.
+
+    El fichero se abre con un buffer de TRACE_BUFFER_SIZE bytes y flush() no
+    hace nada, de modo que las trazas solo llegan al disco cuando el buffer se
+    llena, al llamar a vaciar() o al cerrar el handler.
+    """
+
+    def _open(self):
+        return open(
+            self.baseFilename,
+            self.mode,
+            buffering=TRACE_BUFFER_SIZE,
+            encoding=self.encoding,
+            errors=self.errors,
+        )
+
+    def flush(self):
+        # StreamHandler.emit llama a flush() tras cada registro; se omite a propósito
+        pass
+
+    def vaciar(self):
+        """Vuelca al fichero el contenido pendiente del buffer."""
+        self.acquire()
+        try:
+            if self.stream is not None:
+                self.stream.flush()
+        finally:
+            self.release()
+
+
+class _TraceFormatter(logging.Formatter):
+    """
+    Formatter que deja intactos los bloques de trazas ya formateados.
+
+    Los registros con el atributo ``preformateado`` contienen líneas que el
+    propio hilo ha generado con el formato del fichero, por lo que se escriben
+    tal cual; el resto de registros se formatean con normalidad.
+    """
+
+    def format(self, record):
+        if getattr(record, "preformateado", False):
+            return record.getMessage()
+        return super().format(record)
+
+
+# Handlers de fichero ya creados, indexados por ruta. Se reutilizan en
+# llamadas sucesivas a configurar_trazas y se cierran al terminar el proceso.
+_HANDLER_CACHE: dict[str, _BufferedFileHandler] = {}
+
+
+def _cerrar_handlers():
+    """Vuelca y cierra los handlers de fichero cacheados."""
+    for handler in _HANDLER_CACHE.values():
+        handler.vaciar()
+        handler.close()
+
+
+atexit.register(_cerrar_handlers)
 
 
 def configurar_trazas():
@@ -35,42 +120,60 @@ def configurar_trazas():
 
     Se emplea un FileHandler que sobrescribe el fichero en cada ejecución.
     Incluye la marca de tiempo y el nombre del hilo para facilitar el
-    seguimiento de la intercalación entre hilos.
+    seguimiento de la intercalación entre hilos. Los hilos solo encolan los
+    registros; un QueueListener los escribe en el fichero desde su propio hilo.
+
+    Returns:
+        tuple: (logger, listener). El FileHandler se reutiliza entre llamadas.
     """
     logger = logging.getLogger("traza")
     logger.setLevel(logging.INFO)
 
-    if logger.handlers:
-        return logger
-
-    handler = logging.FileHandler(TRACE_FILE, mode="w", encoding="utf-8")
-    formato = logging.Formatter(
-        "[%(asctime)s.%(msecs)03d] %(threadName)s | %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
-    handler.setFormatter(formato)
-    logger.addHandler(handler)
     logger.propagate = False
-    return logger
+
+    handler = _HANDLER_CACHE.get(TRACE_FILE)
+    if handler is None:
+        handler = _BufferedFileHandler(TRACE_FILE, mode="w", encoding="utf-8", delay=True)
+        formato = _TraceFormatter(
+            "[%(asctime)s.%(msecs)03d] %(threadName)s | %(message)s",
+            datefmt=TRACE_DATEFMT,
+        )
+        handler.setFormatter(formato)
+        _HANDLER_CACHE[TRACE_FILE] = handler
+
+    for anterior in list(logger.handlers):
+        logger.removeHandler(anterior)
+
+    cola = queue.Queue(-1)
+    logger.addHandler(logging.handlers.QueueHandler(cola))
+
+    listener = logging.handlers.QueueListener(cola, handler, respect_handler_level=True)
+    listener.start()
+    return logger, listener
 
 
-def buscar_numero(segmento, numero, *, nombre_hilo, logger):
+def buscar_numero(segmento, numero, resultados, indice, nombre_hilo, logger):
     """
-    Busca un número específico en un segmento del vector y actualiza
-    el contador global de forma sincronizada.
+    Busca un número específico en un segmento del vector y guarda
+    el número de coincidencias en resultados[indice].
 
     Args:
         segmento (list): Subsección del vector donde buscar
         numero (int): Número a buscar en el segmento
+        resultados (array): Resultados parciales, una posición por segmento
+        indice (int): Posición de resultados que corresponde a este segmento
+        nombre_hilo (str): Nombre del segmento para las trazas
+        logger (logging.Logger): Registrador compartido para las trazas
 
-    La función utiliza un lock para garantizar la exclusión mutua
-    al actualizar el contador_global, evitando condiciones de carrera.
+    Cada hilo escribe únicamente en su propia posición de resultados, por lo
+    que no se necesita ningún lock.
     """
-    global contador_global
-
+    # El pool reutiliza sus hilos: se renombra el actual para que el nombre de
+    # hilo de las trazas coincida con el segmento que procesa
+    threading.current_thread().name = nombre_hilo
     thread_id = threading.get_ident()  # Identificador único del hilo de búsqueda
     logger.info(
-        "inicio | hilo=%s | hilo_id=%d | segmento=%s | tamaño=%d | objetivo=%d",
+        _FMT_INICIO,
         nombre_hilo,
         thread_id,
         segmento,
@@ -78,45 +181,53 @@ def buscar_numero(segmento, numero, *, nombre_hilo, logger):
         numero,
     )
 
-    # Contador local para minimizar el tiempo que se mantiene el lock.
-    local_matches = 0
-    for indice_relativo, num in enumerate(segmento):
-        logger.info(
-            "comparacion | hilo=%s | hilo_id=%d | posicion_segmento=%d | valor=%d | objetivo=%d",
-            nombre_hilo,
-            thread_id,
-            indice_relativo,
-            num,
-            numero,
-        )
-        if num == numero:
-            local_matches += 1
-            logger.info(
-                "coincidencia | hilo=%s | hilo_id=%d | posicion_segmento=%d | coincidencias_locales=%d",
-                nombre_hilo,
-                thread_id,
-                indice_relativo,
-                local_matches,
-            )
-
-    # Sección crítica: acumular coincidencias locales en el contador global.
-    with lock:
-        contador_global += local_matches
+    # Contador local: el resultado se publica una sola vez al final.
+    # count() e index() recorren el segmento en C, sin un bucle de comparaciones
+    # en Python; index() solo se invoca una vez por coincidencia.
+    local_matches = segmento.count(numero)
+    # Las posiciones solo se usan en las trazas: no se calculan con INFO desactivado
+    if logger.isEnabledFor(logging.INFO):
+        posiciones = []
+        inicio = 0
+        for _ in range(local_matches):
+            inicio = segmento.index(numero, inicio)
+            posiciones.append(inicio)
+            inicio += 1
         logger.info(
-            "actualizacion_global | hilo=%s | hilo_id=%d | incremento=%d | total=%d",
+            _FMT_RESUMEN,
             nombre_hilo,
             thread_id,
             local_matches,
-            contador_global,
+            posiciones,
+        )
+    # El detalle de cada comparación solo se genera con el nivel DEBUG activo;
+    # por defecto se registran únicamente las coincidencias en un resumen.
+    if logger.isEnabledFor(logging.DEBUG):
+        # Cada línea lleva ya el prefijo del fichero, como un registro propio
+        ahora = time.time()
+        segundo = int(ahora)
+        prefijo = (
+            f"[{time.strftime(TRACE_DATEFMT, time.localtime(segundo))}"
+            f".{int((ahora - segundo) * 1000):03d}] {threading.current_thread().name} | "
         )
+        trazas = [f"{prefijo}comparaciones | hilo={nombre_hilo}"]
+        trazas.extend(
+            f"{prefijo}comparacion | hilo={nombre_hilo} | hilo_id={thread_id} "
+            f"| posicion_segmento={indice_relativo} | valor={num} | objetivo={numero}"
+            for indice_relativo, num in enumerate(segmento)
+        )
+        logger.debug("%s", "\n".join(trazas), extra={"preformateado": True})
+
+    resultados[indice] = local_matches
 
-    print(f"Hilo {nombre_hilo} (id={thread_id}): encontró {local_matches} coincidencias en su segmento.")
+    salida = f"Hilo {nombre_hilo} (id={thread_id}): encontró {local_matches} coincidencias en su segmento.\n"
+    with print_lock:
+        sys.stdout.write(salida)
     logger.info(
-        "fin | hilo=%s | hilo_id=%d | coincidencias_locales=%d | total_global=%d",
+        _FMT_FIN,
         nombre_hilo,
         thread_id,
         local_matches,
-        contador_global,
     )
 
 
@@ -127,15 +238,18 @@ def main():
     Realiza las siguientes tareas:
     1. Inicializa un vector de prueba con números
     2. Divide el vector en 4 segmentos iguales
-    3. Crea un hilo de búsqueda para cada segmento
-    4. Espera a que todos los hilos terminen
-    5. Muestra el resultado total
+    3. Envía al pool una tarea de búsqueda por segmento
+    4. Espera a que todas las tareas terminen
+    5. Suma los resultados parciales y muestra el total
 
     La función maneja la interrupción del usuario mediante
     KeyboardInterrupt para una terminación limpia.
     """
-    logger = configurar_trazas()
+    global contador_global
+
+    logger, listener = configurar_trazas()
     threading.current_thread().name = "principal"
+    # Registro previo al input(): el listener abre el fichero mientras se espera
     logger.info("inicio | Preparando vector y entrada del usuario")
 
     try:
@@ -150,22 +264,32 @@ def main():
         numero_a_buscar = int(input("Introduce el número a buscar en el vector: "))
         logger.info("entrada_usuario | objetivo=%d | vector=%s", numero_a_buscar, vector)
 
-        hilos = []
-        with ExitStack() as stack:
-            for indice, segmento in enumerate(segmentos):
-                nombre_hilo = f"Segmento-{indice + 1}"
-                hilo = threading.Thread(
-                    target=buscar_numero,
-                    name=nombre_hilo,
-                    kwargs={
-                        "segmento": segmento,
-                        "numero": numero_a_buscar,
-                        "nombre_hilo": nombre_hilo,
-                        "logger": logger,
-                    },
+        # Una posición por segmento, cada una en su propia línea de caché:
+        # cada tarea escribe solo en resultados[indice * _RELLENO]
+        resultados = array("q", [0]) * (len(segmentos) * _RELLENO)
+        tareas = []
+        for indice, segmento in enumerate(segmentos):
+            nombre_hilo = f"Segmento-{indice + 1}"
+            tareas.append(
+                _pool.submit(
+                    buscar_numero,
+                    segmento,
+                    numero_a_buscar,
+                    resultados,
+                    indice * _RELLENO,
+                    nombre_hilo,
+                    logger,
                 )
-                stack.enter_context(_ThreadContext(hilo, logger))
-                hilos.append(hilo)
+            )
+            logger.info("creacion_tarea | Enviado %s", nombre_hilo)
+
+        concurrent.futures.wait(tareas)
+        for tarea in tareas:
+            tarea.result()  # Propaga cualquier excepción ocurrida en el hilo
+        logger.info("join_tareas | Finalizados %d segmentos", len(tareas))
+
+        # Todas las tareas han terminado: reducir los resultados parciales
+        contador_global = sum(resultados[::_RELLENO])
 
         print(
             f"\nEl número {numero_a_buscar} fue encontrado un total de {contador_global} veces en el vector."
@@ -183,30 +307,10 @@ def main():
         print("\nError: por favor, introduce un número entero válido.")
         logger.warning("entrada_invalida | Se produjo un ValueError durante la lectura de objetivo")
     finally:
-        for handler in logger.handlers:
-            handler.close()
-
-
-class _ThreadContext:
-    """
-    Inicia un hilo al entrar en el contexto y realiza join al salir,
-    emitiendo trazas sobre ambos eventos. Se usa junto con ExitStack
-    para asegurar la liberación incluso en caso de excepciones.
-    """
-
-    def __init__(self, hilo: threading.Thread, logger: logging.Logger):
-        self.hilo = hilo
-        self.logger = logger
-
-    def __enter__(self):
-        self.hilo.start()
-        self.logger.info("creacion_hilo | Lanzado %s", self.hilo.name)
-        return self.hilo
-
-    def __exit__(self, exc_type, exc, exc_tb):
-        self.hilo.join()
-        self.logger.info("join_hilo | Finalizado %s", self.hilo.name)
-        return False
+        # Detener el listener vacía la cola; el fichero se cierra al salir
+        listener.stop()
+        for handler in listener.handlers:
+            handler.vaciar()
 
 
 if __name__ == "__main__":
@@ -17,38 +17,115 @@ Constantes:
     K (int): Número de libros por biblioteca
 """
 
+import concurrent.futures
 import logging
+import logging.handlers
+import queue
 import random
+import sys
 import threading
 import time
-from contextlib import ExitStack
 
 N = 10  # Lectores
 M = 3  # Bibliotecas
 K = 5  # Libros por biblioteca
 
-# Matriz que representa las bibliotecas y sus libros (1 = disponible, 0 = no disponible)
-bibliotecas = [[1 for _ in range(K)] for _ in range(M)]
 
-# Mutexes para cada biblioteca
-mutex_bibliotecas = [threading.Lock() for _ in range(M)]
+class Biblioteca:
+    """
+    Estado de una biblioteca junto con el lock que lo protege.
+
+    Cada biblioteca es un objeto independiente con su lock y su máscara de
+    libros, de modo que los datos de bibliotecas distintas no se intercalan
+    en las mismas listas. __slots__ evita el diccionario por instancia.
+
+    Attributes:
+        lock (threading.Lock): Mutex que protege el acceso a ``libros``
+        libros (int): Máscara de bits; el bit k vale 1 si el libro k está
+            disponible y 0 si no
+    """
+
+    __slots__ = ("lock", "libros")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.libros = (1 << K) - 1  # Todos los libros disponibles
+
+    def tomar_libro(self):
+        """
+        Reserva el primer libro disponible de la biblioteca.
+
+        El primer libro libre es el bit 1 de menor peso de la máscara, que se
+        aísla con ``libros & -libros`` y se borra con un XOR, sin recorrer
+        los K libros.
+
+        Returns:
+            int: Índice del libro reservado, o -1 si no queda ninguno
+        """
+        with self.lock:
+            # SECCION CRITICA
+            disponibles = self.libros
+            if not disponibles:
+                return -1
+            bit = disponibles & -disponibles
+            self.libros = disponibles ^ bit  # Lo marcamos como no disponible
+            # FIN SECCION CRITICA
+        return bit.bit_length() - 1
+
+    def devolver_libro(self, libro):
+        """
+        Vuelve a marcar como disponible un libro reservado con tomar_libro.
+
+        Args:
+            libro (int): Índice del libro que se devuelve
+        """
+        with self.lock:
+            # SECCION CRITICA
+            self.libros |= 1 << libro
+            # FIN SECCION CRITICA
+
+
+# Bibliotecas de la simulación, cada una con su propio lock
+bibliotecas = [Biblioteca() for _ in range(M)]
 
 # Nombre del fichero que almacenará las trazas de ejecución
 TRACE_FILE = "ParteC_en_Python.log"
 
 
+class _ColaSinFormato(logging.handlers.QueueHandler):
+    """
+    QueueHandler que encola el registro tal cual, sin formatearlo.
+
+    El QueueHandler estándar formatea el mensaje en prepare() para poder
+    serializarlo; aquí la cola es local al proceso, así que se deja ese
+    trabajo al hilo del QueueListener.
+    """
+
+    def prepare(self, record):
+        return record
+
+
 def configurar_trazas():
     """
     Configura un logger compartido con marca temporal y nombre de hilo.
 
     Este logger se reutiliza por todos los hilos para dejar constancia de
-    cada operación crítica sin interferir en la salida estándar.
+    cada operación crítica. Los lectores encolan los registros sin
+    formatear; un QueueListener les da formato y los escribe desde su
+    propio hilo en el fichero.
+
+    Los mensajes de consola de los lectores y de main van por el logger
+    "consola" a la misma cola, de modo que el listener los imprime en el
+    orden en que se produjeron.
+
+    Returns:
+        tuple: (logger, listener). Cada llamada sustituye la cola y el
+        listener anteriores, de modo que main() puede ejecutarse varias veces.
     """
     logger = logging.getLogger("traza")
     logger.setLevel(logging.INFO)
-
-    if logger.handlers:
-        return logger
+    consola_log = logging.getLogger("consola")
+    consola_log.setLevel(logging.INFO)
 
     handler = logging.FileHandler(TRACE_FILE, mode="w", encoding="utf-8")
     formato = logging.Formatter(
@@ -56,9 +133,26 @@ def configurar_trazas():
         datefmt="%Y-%m-%d %H:%M:%S",
     )
     handler.setFormatter(formato)
-    logger.addHandler(handler)
-    logger.propagate = False
-    return logger
+    # El fichero solo recibe la traza, y la consola solo sus propios mensajes
+    handler.addFilter(logging.Filter("traza"))
+
+    consola = logging.StreamHandler(sys.stdout)
+    consola.setFormatter(logging.Formatter("%(message)s"))
+    consola.addFilter(logging.Filter("consola"))
+
+    cola = queue.Queue(-1)
+    for registrador in (logger, consola_log):
+        # Las colas de una ejecución anterior ya no tienen listener que las vacíe
+        for anterior in list(registrador.handlers):
+            registrador.removeHandler(anterior)
+        registrador.addHandler(_ColaSinFormato(cola))
+        registrador.propagate = False
+
+    listener = logging.handlers.QueueListener(
+        cola, handler, consola, respect_handler_level=True
+    )
+    listener.start()
+    return logger, listener
 
 
 def funcion_lector(id_lector, logger):
@@ -83,144 +177,148 @@ def funcion_lector(id_lector, logger):
     La sincronización se realiza mediante locks individuales para cada biblioteca,
     asegurando acceso exclusivo al modificar el estado de los libros.
     """
+    # El hilo del pool toma el nombre del lector para que las trazas lo reflejen
+    threading.current_thread().name = f"Lector-{id_lector}"
     biblioteca_actual = id_lector % M
+    # Valores constantes durante toda la vida del lector
+    hilo_id = threading.get_ident()
+    info_activo = logger.isEnabledFor(logging.INFO)
+    # Generador propio del lector: no comparte el generador global con otros hilos
+    rng = random.Random()
+    consola = logging.getLogger("consola")
     # Anotar en la traza que el lector llega a su primera biblioteca
     logger.info(
         "inicio | lector=%d | hilo_id=%d | biblioteca=%d",
         id_lector,
-        threading.get_ident(),
+        hilo_id,
         biblioteca_actual,
     )
 
     for i in range(K):
-        libro_tomado = -1
-
-        lock_actual = mutex_bibliotecas[biblioteca_actual]
-
-        with lock_actual:
-            # SECCION CRITICA
-            for k in range(K):
-                if bibliotecas[biblioteca_actual][k] == 1:  # Libro disponible
-                    bibliotecas[biblioteca_actual][k] = 0  # Lo marcamos como no disponible
-                    libro_tomado = k
-                    print(
-                        f"[Lector {id_lector}] accede a biblioteca {biblioteca_actual} - toma libro {k}"
-                    )
-                    # Registrar qué libro concreto ha sido reservado dentro de esta biblioteca
-                    logger.info(
-                        "obtiene_libro | lector=%d | hilo_id=%d | biblioteca=%d | libro=%d",
-                        id_lector,
-                        threading.get_ident(),
-                        biblioteca_actual,
-                        libro_tomado,
-                    )
-                    break
-            # FIN SECCION CRITICA
+        biblioteca = bibliotecas[biblioteca_actual]
+        # La sección crítica se limita al cambio de estado del libro
+        libro_tomado = biblioteca.tomar_libro()
 
         if libro_tomado != -1:
+            # Las trazas se emiten fuera del lock para no retener la biblioteca
+            # Registrar qué libro concreto ha sido reservado dentro de esta biblioteca
+            if info_activo:
+                logger.info(
+                    "obtiene_libro | lector=%d | hilo_id=%d | biblioteca=%d | libro=%d",
+                    id_lector,
+                    hilo_id,
+                    biblioteca_actual,
+                    libro_tomado,
+                )
+            consola.info(
+                "[Lector %d] accede a biblioteca %d - toma libro %d",
+                id_lector,
+                biblioteca_actual,
+                libro_tomado,
+            )
+
             # Dormir al hilo que está leyendo
-            time.sleep(random.random() * 2 + 1)
+            time.sleep(rng.uniform(1.0, 3.0))
 
             # Ahora, devuelve el libro a su sitio y pasa a la siguiente biblioteca
             biblioteca_siguiente = (biblioteca_actual + 1) % M
 
-            with lock_actual:
-                # SECCION CRITICA
-                bibliotecas[biblioteca_actual][libro_tomado] = 1  # Devolvemos el libro
-                print(
-                    f"[Lector {id_lector}] devuelve libro {libro_tomado} - pasa a biblioteca {biblioteca_siguiente}"
-                )
-                # Dejar constancia de que el recurso vuelve a estar disponible
+            biblioteca.devolver_libro(libro_tomado)
+
+            # Dejar constancia de que el recurso vuelve a estar disponible
+            if info_activo:
                 logger.info(
                     "devuelve_libro | lector=%d | hilo_id=%d | biblioteca=%d | libro=%d",
                     id_lector,
-                    threading.get_ident(),
+                    hilo_id,
                     biblioteca_actual,
                     libro_tomado,
                 )
-                # FIN SECCION CRITICA
 
             # Notificar hacia dónde se desplaza el lector después de devolver el libro
-            logger.info(
-                "cambia_biblioteca | lector=%d | hilo_id=%d | siguiente=%d",
+            if info_activo:
+                logger.info(
+                    "cambia_biblioteca | lector=%d | hilo_id=%d | siguiente=%d",
+                    id_lector,
+                    hilo_id,
+                    biblioteca_siguiente,
+                )
+            consola.info(
+                "[Lector %d] devuelve libro %d - pasa a biblioteca %d",
                 id_lector,
-                threading.get_ident(),
+                libro_tomado,
                 biblioteca_siguiente,
             )
             biblioteca_actual = biblioteca_siguiente
         else:
-            print(
-                f"[Lector {id_lector}] no encuentra libros en biblioteca {biblioteca_actual} - abandona"
-            )
             # Registrar el abandono por falta de disponibilidad
             logger.info(
                 "abandona | lector=%d | hilo_id=%d | biblioteca=%d",
                 id_lector,
-                threading.get_ident(),
+                hilo_id,
+                biblioteca_actual,
+            )
+            consola.info(
+                "[Lector %d] no encuentra libros en biblioteca %d - abandona",
+                id_lector,
                 biblioteca_actual,
             )
             break
-        print(f"[Lector {id_lector}] terminando.")
+        consola.info("[Lector %d] terminando.", id_lector)
+        if info_activo:
+            logger.info("terminando | lector=%d | hilo_id=%d", id_lector, hilo_id)
     else:
         # Si el bucle finaliza sin break, todas las iteraciones terminaron correctamente
         logger.info(
             "finaliza | lector=%d | hilo_id=%d | biblioteca=%d",
             id_lector,
-            threading.get_ident(),
+            hilo_id,
             biblioteca_actual,
         )
 
 
-class _ThreadContext:
+def main():
     """
-    Inicia un hilo al entrar y sincroniza con join al salir,
-    registrando ambos eventos en el logger compartido.
-    """
-
-    def __init__(self, hilo: threading.Thread, logger: logging.Logger):
-        self.hilo = hilo
-        self.logger = logger
+    Función principal que lanza la simulación.
 
-    def __enter__(self):
-        self.hilo.start()
-        self.logger.info("creacion_hilo | hilo=%s", self.hilo.name)
-        return self.hilo
-
-    def __exit__(self, exc_type, exc, exc_tb):
-        self.hilo.join()
-        self.logger.info("join_hilo | hilo=%s", self.hilo.name)
-        return False
-
-
-if __name__ == "__main__":
-    log = configurar_trazas()
+    Configura las trazas, ejecuta los N lectores en un pool de hilos y
+    espera a que todos terminen. Al estar en una función, el módulo puede
+    importarse (por ejemplo, ``from ParteC_en_Python import main``) sin
+    lanzar la simulación.
+    """
+    log, listener = configurar_trazas()
+    # Los mensajes de main pasan por la misma cola que los de los lectores
+    consola = logging.getLogger("consola")
     threading.current_thread().name = "principal"
     log.info("inicio_simulacion | Preparando lectores")
 
     try:
-        hilos_lectores = []
-
-        print("Iniciando simulación en Python...")
-
-        for i in range(N):
-            nombre_hilo = f"Lector-{i}"
-            hilo = threading.Thread(
-                target=funcion_lector,
-                name=nombre_hilo,
-                kwargs={"id_lector": i, "logger": log},
-            )
-            hilos_lectores.append(hilo)
-            log.info("hilo_creado | lector=%d | hilo=%s", i, nombre_hilo)
+        consola.info("Iniciando simulación en Python...")
 
-        with ExitStack() as stack:
-            for hilo in hilos_lectores:
-                stack.enter_context(_ThreadContext(hilo, log))
+        # Un hilo del pool por lector; cada lector deja su traza de inicio
+        # desde su propio hilo. list() espera a todos y propaga sus excepciones.
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=N, thread_name_prefix="Lector"
+        ) as ejecutor:
+            list(ejecutor.map(funcion_lector, range(N), [log] * N))
+        log.info("join_lectores | Finalizados %d lectores", N)
 
-        print("Simulación finalizada.")
+        consola.info("Simulación finalizada.")
         log.info("fin_simulacion | Todos los lectores han terminado")
     except KeyboardInterrupt:
-        print("\nEjecución interrumpida por el usuario.")
+        consola.info("\nEjecución interrumpida por el usuario.")
         log.info("interrupcion | Señal de teclado recibida")
     finally:
-        for handler in log.handlers:
+        # Detener el listener vacía la cola antes de cerrar los ficheros
+        listener.stop()
+        for handler in listener.handlers:
             handler.close()
+        # Sin listener, la cola ya no se vacía: se retiran sus handlers
+        for registrador in (log, consola):
+            for handler in list(registrador.handlers):
+                registrador.removeHandler(handler)
+                handler.close()
+
+
+if __name__ == "__main__":
+    main()